@@ -4,17 +4,43 @@ from PySide6.QtWidgets import (
     QSplitter
 )
 from PySide6.QtWebEngineWidgets import QWebEngineView
-from PySide6.QtCore import Qt, QThread, Signal, QSettings, QEvent
+from PySide6.QtWebEngineCore import QWebEngineScript
+from PySide6.QtGui import QTextCursor
+from PySide6.QtCore import Qt, QObject, QRunnable, QThreadPool, QTimer, Signal, QSettings, QEvent
 import httpx
-from typing import Any
-import json
+from typing import Any, Iterator
+import orjson
 import fitz
-import base64
+import pybase64
 import os  
+import hashlib
+import pickle
+import mmap
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import argparse
-from pydantic import BaseModel
+import logging
+from pydantic import BaseModel, TypeAdapter
 from typing import Literal
 
+# Quality of the JPEG images of the PDF pages sent to Gemini.
+JPEG_QUALITY = 85
+
+logger = logging.getLogger(__name__)
+
+GEMINI_API_KEY = os.environ["GEMINI_API_KEY"]
+
+def redact_api_key(text: str) -> str:
+    """Hides the API key in text shown to the user, e.g. httpx errors which include the request URL."""
+    return text.replace(GEMINI_API_KEY, "***") if GEMINI_API_KEY else text
+
+# Shared by all requests to Google so that connections are kept alive and reused.
+HTTPX_CLIENT = httpx.Client(
+    http2=True,
+    timeout=30,
+    limits=httpx.Limits(max_keepalive_connections=8, keepalive_expiry=60),
+)
+
 class AppSettings(BaseModel):
     model: str = "gemini-2.0-flash"
     max_output_tokens: int = 1000
@@ -24,6 +50,12 @@ class AppSettings(BaseModel):
     system_prompt_whole_pdf: str
     font_size: int = 12
 
+# Validates the raw bytes of the settings file, reusing the core schema of AppSettings.
+_SETTINGS_ADAPTER = TypeAdapter(AppSettings)
+
+class GeminiResponseError(Exception):
+    pass
+
 class Gemini:
     def __init__(
         self,
@@ -34,8 +66,8 @@ class Gemini:
         self._model = model
         self._system_prompt = system_prompt
         self._max_output_tokens = max_output_tokens
-        self._httpx_client = httpx.Client(timeout=30)
-        self._api_key = os.environ["GEMINI_API_KEY"]
+        self._httpx_client = HTTPX_CLIENT
+        self._url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:streamGenerateContent?alt=sse&key={GEMINI_API_KEY}"
 
     def send(
         self,
@@ -43,7 +75,8 @@ class Gemini:
         images: list[str] | None,
         pdf_uploaded_file_uri: str | None,
         history: list[dict[str, str]] | None
-    ) -> dict[str, Any]:
+    ) -> Iterator[str]:
+        """Streams the answer of Gemini, yielding the text as it is generated."""
         contents = []
         if history:
             for h in history:
@@ -53,7 +86,7 @@ class Gemini:
             for pix in images:
                 d = {
                     "inline_data": {
-                        "mime_type": f"image/png",
+                        "mime_type": f"image/jpeg",
                         "data": pix,
                     }
                 }
@@ -77,17 +110,35 @@ class Gemini:
             },
             "contents": contents,
         }
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{self._model}:generateContent?key={self._api_key}"
-        print(f"Prompting Gemini: {url=} {len(str(data))=} {len(contents)=}")
-        response = self._httpx_client.post(url, json=data)
-        print(f"Received response: {response=} {response.json()=}")
-        response.raise_for_status()
-        return response
-
-class GeminiWorker(QThread):
+        body = orjson.dumps(data)
+        logger.info("Prompting Gemini: model=%s body=%d bytes contents=%d", self._model, len(body), len(contents))
+        with self._httpx_client.stream("POST", self._url, content=body, headers={"Content-Type": "application/json"}) as response:
+            logger.debug("gemini response status=%s", response.status_code)
+            if response.is_error:
+                response.read()
+                logger.warning("gemini error status=%s body=%s", response.status_code, response.text)
+            response.raise_for_status()
+            # Server-sent events: each "data:" line holds a partial GenerateContentResponse.
+            for line in response.iter_lines():
+                if not line.startswith("data:"):
+                    continue
+                chunk = orjson.loads(line[len("data:"):])
+                try:
+                    parts = chunk["candidates"][0].get("content", {}).get("parts", [])
+                except (KeyError, IndexError) as e:
+                    raise GeminiResponseError(f"{type(e)} {str(e)} {chunk}") from e
+                for part in parts:
+                    if "text" in part:
+                        yield part["text"]
+
+class GeminiWorkerSignals(QObject):
+    # QRunnable is not a QObject, so GeminiWorker emits through this object.
+    chunk_received = Signal(str)
     response_received = Signal(str, str)
     error_occurred = Signal(str)
 
+class GeminiWorker(QRunnable):
+
     def __init__(
         self, 
         query: str, 
@@ -97,6 +148,7 @@ class GeminiWorker(QThread):
         history: list[dict[str, str]] | None,
     ):
         super().__init__()
+        self.signals = GeminiWorkerSignals()
         self.query = query
         self.pdf_images = pdf_images
         self.pdf_uploaded_file_uri = pdf_uploaded_file_uri
@@ -104,33 +156,38 @@ class GeminiWorker(QThread):
         self.history = history
     
     def run(self):
-        gemini = Gemini(
-            model=self.app_settings.model,
-            system_prompt=(
-                self.app_settings.system_prompt_whole_pdf
-                if self.app_settings.send_pdf in ("whole_images", "whole_pdf")
-                else self.app_settings.system_prompt_no_whole_pdf
-            ),
-            max_output_tokens=self.app_settings.max_output_tokens,
-        )
+        chunks = []
         try:
-            response = gemini.send(self.query, self.pdf_images, self.pdf_uploaded_file_uri, self.history).json()
-        except (httpx.HTTPError, json.decoder.JSONDecodeError) as e:
-            self.error_occurred.emit(f"ERROR: {type(e)} {str(e)}")
+            gemini = Gemini(
+                model=self.app_settings.model,
+                system_prompt=(
+                    self.app_settings.system_prompt_whole_pdf
+                    if self.app_settings.send_pdf in ("whole_images", "whole_pdf")
+                    else self.app_settings.system_prompt_no_whole_pdf
+                ),
+                max_output_tokens=self.app_settings.max_output_tokens,
+            )
+            for chunk in gemini.send(self.query, self.pdf_images, self.pdf_uploaded_file_uri, self.history):
+                chunks.append(chunk)
+                self.signals.chunk_received.emit(chunk)
+        except (httpx.HTTPError, orjson.JSONDecodeError) as e:
+            self.signals.error_occurred.emit(redact_api_key(f"ERROR: {type(e)} {str(e)}"))
             return
-        try:
-            text = response["candidates"][0]["content"]["parts"][0]["text"]
-            self.response_received.emit(self.query, text)
-        except (KeyError, IndexError) as e:
-            self.error_occurred.emit(f"ERROR: {type(e)} {str(e)} {response}")
+        except GeminiResponseError as e:
+            self.signals.error_occurred.emit(f"ERROR: {str(e)}")
+            return
+        except Exception as e:
+            # e.g. httpx.InvalidURL for a bad model name. Always emit so that the UI re-enables the send button.
+            err = redact_api_key(f"ERROR: {type(e)} {str(e)}")
+            logger.error("Gemini request failed: %s", err)
+            self.signals.error_occurred.emit(err)
+            return
+        self.signals.response_received.emit(self.query, "".join(chunks))
 
 def upload_pdf_to_goole(filename: str) -> str:
-    api_key = os.environ["GEMINI_API_KEY"]
-    with open(filename, "rb") as f:
-        pdf_bytes = f.read()
-    num_bytes = len(pdf_bytes)
+    num_bytes = os.path.getsize(filename)
     # Initial resumable request defining metadata.
-    url = f"https://generativelanguage.googleapis.com/upload/v1beta/files?key={api_key}"
+    url = f"https://generativelanguage.googleapis.com/upload/v1beta/files?key={GEMINI_API_KEY}"
     d = {
         "file": {
             "display_name": "TEXT",
@@ -141,10 +198,11 @@ def upload_pdf_to_goole(filename: str) -> str:
         "X-Goog-Upload-Command": "start",
         "X-Goog-Upload-Header-Content-Length": str(num_bytes),
         "X-Goog-Upload-Header-Content-Type": "application/pdf",
+        "Content-Type": "application/json",
     }
-    print(f"Sending: {url=} {d=} {headers=}")
-    response = httpx.post(url, headers=headers, json=d)
-    print(f"Received: {response=} {response.content=} {response.headers=}")
+    logger.debug("upload start request %s headers=%s", d, headers)
+    response = HTTPX_CLIENT.post(url, headers=headers, content=orjson.dumps(d))
+    logger.debug("upload start response status=%s len=%d", response.status_code, len(response.content))
     response.raise_for_status()
     # Get URL to upload to
     url = response.headers["x-goog-upload-url"]
@@ -154,29 +212,118 @@ def upload_pdf_to_goole(filename: str) -> str:
         "X-Goog-Upload-Offset": "0",
         "X-Goog-Upload-Command": "upload, finalize",
     }
-    print(f"Sending: {url=} {headers=}")
-    response = httpx.post(url, headers=headers, content=pdf_bytes)
-    print(f"Received: {response=} {response.content=} {response.headers=}")
+    logger.debug("upload request %d bytes", num_bytes)
+    if num_bytes == 0:
+        # An empty file cannot be memory-mapped.
+        response = HTTPX_CLIENT.post(url, headers=headers, content=b"")
+    else:
+        # Stream the memory-mapped file instead of reading it all in memory first.
+        with open(filename, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            response = HTTPX_CLIENT.post(url, headers=headers, content=iter(lambda: mm.read(1 << 20), b""))
+    logger.debug("upload response status=%s len=%d", response.status_code, len(response.content))
     response.raise_for_status()
-    d = response.json()
+    d = orjson.loads(response.content)
     file_uri = d["file"]["uri"]
     return file_uri
     
+def _cache_path(pdf_path: str) -> str:
+    """Path of the on-disk cache of the page images of a PDF, keyed by the hash of its contents."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(pdf_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "reader-companion")
+    return os.path.join(cache_dir, f"{h.hexdigest()}-jpeg{JPEG_QUALITY}.pkl")
+
 def get_pdf_images(pdf_path: str) -> list[str]:
     """From a PDF document converts all of its pages tp images and return the b64 encoding, one per page."""
-    ret = []
-    doc = fitz.open(pdf_path)
-    for page_num in range(doc.page_count):
-        page = doc[page_num]
-        pix = page.get_pixmap()
-        pix_bytes = pix.tobytes()
-        pix_b64 = base64.b64encode(pix_bytes).decode("utf-8")
-        ret.append(pix_b64)
+    cache_path = _cache_path(pdf_path)
+    # The cache is only an optimization: any problem with it falls back to rendering the pages.
+    if os.path.exists(cache_path):
+        logger.info("Loading PDF images from cache %s", cache_path)
+        try:
+            with open(cache_path, "rb") as f:
+                ret = pickle.load(f)
+            if isinstance(ret, list) and all(isinstance(pix, str) for pix in ret):
+                return ret
+            logger.warning("Invalid cache %s, rendering the PDF again", cache_path)
+        except Exception as e:
+            # e.g. OSError, UnpicklingError, EOFError, or ValueError for an unsupported pickle protocol.
+            logger.warning("Could not read cache %s, rendering the PDF again: %s", cache_path, e)
+        # Falls through to rendering, which overwrites the bad entry.
+    ret = _render_pdf_images(pdf_path)
+    # Write to a temporary file first so an interrupted write never leaves a truncated cache entry.
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            pickle.dump(ret, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning("Could not write cache %s: %s", cache_path, e)
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
     return ret
 
-def get_pdf_bytes(pdf_path: str) -> bytes:
-    with open(pdf_path, "rb") as f:
-        return base64.b64encode(f.read()).decode("utf-8")
+def _encode_pdf_page(page: fitz.Page) -> str:
+    # Render straight to RGB: JPEG has no alpha channel, so there is nothing to strip before encoding.
+    pix = page.get_pixmap(alpha=False)
+    pix_bytes = pix.tobytes("jpeg", jpg_quality=JPEG_QUALITY)
+    return pybase64.b64encode_as_string(pix_bytes)
+
+def _render_pdf_page_range(pdf_path: str, start: int, stop: int) -> list[str]:
+    with fitz.open(pdf_path) as doc:
+        return [_encode_pdf_page(doc[page_num]) for page_num in range(start, stop)]
+
+def _render_pdf_images(pdf_path: str) -> list[str]:
+    # PyMuPDF does not support multithreading, so split the pages in contiguous ranges
+    # rendered by separate processes, each one opening its own copy of the document.
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+    num_workers = min(os.cpu_count() or 1, page_count)
+    if num_workers <= 1:
+        return _render_pdf_page_range(pdf_path, 0, page_count)
+    bounds = [page_count * i // num_workers for i in range(num_workers + 1)]
+    # Always spawn: forking this process, which runs Qt, QtWebEngine and the QThreadPool threads,
+    # can deadlock the children. The cost is that each worker re-imports this script (PySide6
+    # included, but no QApplication is created) before rendering, on every platform alike.
+    mp_context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=num_workers, mp_context=mp_context) as executor:
+        futures = [
+            executor.submit(_render_pdf_page_range, pdf_path, start, stop)
+            for start, stop in zip(bounds, bounds[1:])
+        ]
+        return [pix for future in futures for pix in future.result()]
+
+def get_one_pdf_image(pdf_path: str, page_num: int) -> str:
+    """Converts a single page of a PDF document to an image and return its b64 encoding. Pages are numbered from 0."""
+    with fitz.open(pdf_path) as doc:
+        page_num = min(max(page_num, 0), doc.page_count - 1)
+        return _encode_pdf_page(doc[page_num])
+
+# Helpers injected once in the viewer page, so that runJavaScript calls are short function calls.
+READER_COMPANION_JS = """
+window.__rc = {
+    page: () => PDFViewerApplication.page,
+    sidebarOpen: () => PDFViewerApplication.pdfSidebar.isOpen,
+    setSidebar: (v) => PDFViewerApplicationOptions.set('sidebarViewOnLoad', v),
+};
+"""
+
+def make_helpers_script() -> QWebEngineScript:
+    script = QWebEngineScript()
+    script.setName("reader-companion-helpers")
+    script.setSourceCode(READER_COMPANION_JS)
+    script.setInjectionPoint(QWebEngineScript.InjectionPoint.DocumentReady)
+    # PDFViewerApplication lives in the page's own world.
+    script.setWorldId(QWebEngineScript.ScriptWorldId.MainWorld)
+    script.setRunsOnSubFrames(False)
+    return script
+
+# How long to wait for PDF.js to report the displayed page.
+PAGE_QUERY_TIMEOUT_MS = 2000
 
 class ReaderCompanion(QMainWindow):
     def __init__(self, pdf_viewer: str, filename: str, settings_file: str):
@@ -186,11 +333,22 @@ class ReaderCompanion(QMainWindow):
         self.pdf_viewer = os.path.abspath(pdf_viewer).replace("\\", "/")
         self.filename = os.path.abspath(filename)
         self.settings_file = settings_file
+        self._settings_cache: tuple[tuple[int, int], AppSettings] | None = None
         self.pdf_images = None
         self.pdf_uploaded_file_uri = None
+        self.current_page = 1
+        self.page_query_id = 0
         self.history = None
+        self.waiting_for_first_chunk = False
+        self.pool = QThreadPool.globalInstance()
         self.view = QWebEngineView(self)
-        self.view.page().selectionChanged.connect(self.copy_to_input)
+        self.view.page().scripts().insert(make_helpers_script())
+        # selectionChanged fires continuously while dragging, only copy once the selection settles.
+        self.selection_timer = QTimer(self)
+        self.selection_timer.setSingleShot(True)
+        self.selection_timer.setInterval(150)
+        self.selection_timer.timeout.connect(self.copy_to_input)
+        self.view.page().selectionChanged.connect(self.selection_timer.start)
         self.view.page().loadFinished.connect(self.set_sidebar_status)
         self.sidebar_open = None
         self.input = QTextEdit()
@@ -221,7 +379,7 @@ class ReaderCompanion(QMainWindow):
         self.output.setFont(font)
         self.apply_qsettings()
         url = f"file:///{self.pdf_viewer}/web/viewer.html?file={self.filename}"
-        print(f"{url=}")
+        logger.info("Loading %s", url)
         self.view.load(url)
     
     def apply_qsettings(self) -> None:
@@ -239,7 +397,7 @@ class ReaderCompanion(QMainWindow):
         self.qsettings.sync()
     
     def get_sidebar_status_then_save(self) -> None:
-        self.view.page().runJavaScript("PDFViewerApplication.pdfSidebar.isOpen", self.handle_get_sidebar_status_then_save)
+        self.view.page().runJavaScript("__rc.sidebarOpen()", self.handle_get_sidebar_status_then_save)
     
     def handle_get_sidebar_status_then_save(self, result) -> None:
         self.sidebar_open = int(result)
@@ -247,7 +405,7 @@ class ReaderCompanion(QMainWindow):
 
     def set_sidebar_status(self) -> None:
         if self.sidebar_open is not None:
-            js = f"PDFViewerApplicationOptions.set('sidebarViewOnLoad', {int(self.sidebar_open)})"
+            js = f"__rc.setSidebar({int(self.sidebar_open)})"
             self.view.page().runJavaScript(js, self.handle_set_sidebar_status)
 
     def handle_set_sidebar_status(self, result) -> None:
@@ -257,53 +415,126 @@ class ReaderCompanion(QMainWindow):
         self.get_sidebar_status_then_save()
         return super().closeEvent(event)
 
-    def get_settings(self) -> AppSettings:            
-        with open(self.settings_file, "rt") as f:
-            return AppSettings.model_validate_json(f.read())
+    def get_settings(self) -> AppSettings:
+        # Only re-read the settings file when it has been modified. The size is part of the key
+        # because filesystems with coarse timestamps can keep the same mtime across an edit.
+        stat = os.stat(self.settings_file)
+        key = (stat.st_mtime_ns, stat.st_size)
+        if self._settings_cache is not None and self._settings_cache[0] == key:
+            return self._settings_cache[1]
+        with open(self.settings_file, "rb") as f:
+            app_settings = _SETTINGS_ADAPTER.validate_json(f.read())
+        self._settings_cache = (key, app_settings)
+        return app_settings
         
     def copy_to_input(self):
-        self.view.page().runJavaScript("window.getSelection().toString();", self.set_text_input)
-    
-    def set_text_input(self, result):
-        if result:
-            self.input.setText(result)
+        # selectedText() is kept up to date on the Qt side, no need to ask the renderer.
+        text = self.view.page().selectedText()
+        if text:
+            self.input.setText(text)
 
     def send_to_gemini(self, *args, **kwargs):
         self.output.setText("Waiting ...")
         app_settings = self.get_settings()
+        # One request at a time: answers are streamed into the same output box and appended to
+        # the history in completion order. Re-enabled in handle_gemini_response/handle_gemini_error.
+        self.send.setEnabled(False)
+        if app_settings.send_pdf == "single_page":
+            # Ask PDF.js which page is displayed, then send once we know. The callback may never
+            # come if the viewer is not loaded, so give up after a timeout.
+            self.page_query_id += 1
+            query_id = self.page_query_id
+            self.view.page().runJavaScript(
+                "__rc.page()",
+                lambda result: self.handle_current_page_then_send(query_id, app_settings, result),
+            )
+            QTimer.singleShot(PAGE_QUERY_TIMEOUT_MS, lambda: self.handle_current_page_timeout(query_id))
+        else:
+            self.start_gemini_worker(app_settings)
+
+    def handle_current_page_then_send(self, query_id: int, app_settings: AppSettings, result) -> None:
+        if query_id != self.page_query_id:
+            # Timed out or superseded by a newer query.
+            return
+        self.page_query_id += 1
+        if isinstance(result, bool) or not isinstance(result, (int, float)) or result != int(result) or result < 1:
+            logger.warning("Could not get the current page from the PDF viewer: %r", result)
+            self.handle_gemini_error(f"ERROR: could not get the current page from the PDF viewer: {result!r}")
+            return
+        self.current_page = int(result)
+        self.start_gemini_worker(app_settings)
+
+    def handle_current_page_timeout(self, query_id: int) -> None:
+        if query_id != self.page_query_id:
+            return
+        self.page_query_id += 1
+        logger.warning("Timed out getting the current page from the PDF viewer")
+        self.handle_gemini_error("ERROR: the PDF viewer did not report the current page, is the PDF loaded?")
+
+    def start_gemini_worker(self, app_settings: AppSettings) -> None:
+        try:
+            pdf_images = self.prepare_pdf(app_settings)
+        except Exception as e:
+            # Otherwise the exception escapes the slot and the button stays disabled.
+            err = redact_api_key(f"ERROR: {type(e)} {str(e)}")
+            logger.error("Could not prepare the PDF: %s", err)
+            self.handle_gemini_error(err)
+            return
+        if app_settings.history:
+            if not self.history:
+                self.history = []
+        else:
+            self.history = None
+        text = self.input.toPlainText()
+        worker = GeminiWorker(text, pdf_images, self.pdf_uploaded_file_uri, app_settings, self.history)
+        self.waiting_for_first_chunk = True
+        worker.signals.chunk_received.connect(self.handle_gemini_response_chunk)
+        worker.signals.response_received.connect(self.handle_gemini_response)
+        worker.signals.error_occurred.connect(self.handle_gemini_error)
+        self.pool.start(worker)
+
+    def prepare_pdf(self, app_settings: AppSettings) -> list[str] | None:
+        """Gets the images or uploads the PDF as required by the settings, returns the images to send."""
         if app_settings.send_pdf == "whole_images":
             if not self.pdf_images:
-                print("Getting PDF images once")
+                logger.info("Getting PDF images once")
                 self.pdf_images = get_pdf_images(self.filename)
-                total_bytes = sum([len(pix) for pix in self.pdf_images])
-                print(f"Got {len(self.pdf_images)} pages {total_bytes} bytes")
+                total_bytes = sum(map(len, self.pdf_images))
+                logger.info("Got %d pages %d bytes", len(self.pdf_images), total_bytes)
+            pdf_images = self.pdf_images
         else:
             self.pdf_images = None
+            pdf_images = None
+        if app_settings.send_pdf == "single_page":
+            logger.info("Getting image of page %d", self.current_page)
+            pdf_images = [get_one_pdf_image(self.filename, self.current_page - 1)]
         if app_settings.send_pdf == "whole_pdf":
             if not self.pdf_uploaded_file_uri:
-                print("Uploading PDF to Google once")
+                logger.info("Uploading PDF to Google once")
                 self.pdf_uploaded_file_uri = upload_pdf_to_goole(self.filename)
         else:
             self.pdf_uploaded_file_uri = None
-        if app_settings.history:
-            if not self.history:
-                self.history = []
-        else:
-            self.history = None
-        text = self.input.toPlainText()
-        self.thread = GeminiWorker(text, self.pdf_images, self.pdf_uploaded_file_uri, app_settings, self.history)
-        self.thread.response_received.connect(self.handle_gemini_response)
-        self.thread.error_occurred.connect(self.handle_gemini_error)
-        self.thread.start()
+        return pdf_images
     
+    def handle_gemini_response_chunk(self, chunk):
+        if self.waiting_for_first_chunk:
+            self.output.clear()
+            self.waiting_for_first_chunk = False
+        cursor = self.output.textCursor()
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.insertText(chunk)
+
     def handle_gemini_response(self, query, text):
+        # The chunks were appended as plain text, render the whole answer as markdown once it is complete.
         self.output.setMarkdown(text)
         if self.history is not None:
             self.history.append({"text": query, "role": "user"})
             self.history.append({"text": text, "role": "model"})
+        self.send.setEnabled(True)
     
     def handle_gemini_error(self, err):
         self.output.setText(err)
+        self.send.setEnabled(True)
 
 def parse_args() -> Any:
     parser = argparse.ArgumentParser(prog='reader-companion')
@@ -314,9 +545,12 @@ def parse_args() -> Any:
     return args
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    # httpx logs request URLs at INFO level, and those contain the API key.
+    logging.getLogger("httpx").setLevel(logging.WARNING)
     app = QApplication([])
     args = parse_args()
-    print(args)
+    logger.info("%s", args)
     window = ReaderCompanion(args.pdf_viewer, args.file, args.settings)
     window.show()
     app.exec()